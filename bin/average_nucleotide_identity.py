@@ -101,7 +101,9 @@
 #                         present)
 #   --skip_blast          Skip BLAST runs, for testing (e.g. if output already
 #                         present)
-#   --noclobber           Don't nuke existing files
+#   --noclobber           Don't nuke existing files (with -f, also reuses
+#                         cached input sequence lengths from the output
+#                         directory)
 #   -g, --graphics        Generate heatmap of ANI
 #   -m METHOD, --method=METHOD
 #                         ANI method
@@ -165,6 +167,7 @@ import time
 import traceback
 
 from argparse import ArgumentParser
+from concurrent.futures import ThreadPoolExecutor
 
 from pyani import (
     anib,
@@ -258,7 +261,8 @@ def parse_cmdline():
         dest="noclobber",
         action="store_true",
         default=False,
-        help="Don't nuke existing files",
+        help="Don't nuke existing files (with -f, also reuses cached "
+        + "input sequence lengths from the output directory)",
     )
     parser.add_argument(
         "--nocompress",
@@ -328,7 +332,8 @@ def parse_cmdline():
         action="store",
         default=None,
         type=int,
-        help="Number of worker processes for multiprocessing "
+        help="Number of worker processes for multiprocessing, and for "
+        "parsing input and output files "
         "(default zero, meaning use all available cores)",
     )
     parser.add_argument(
@@ -538,6 +543,7 @@ def calculate_anim(infiles, org_lengths):
             filter_exe=args.filter_exe,
             maxmatch=args.maxmatch,
             jobprefix=args.jobprefix,
+            org_lengths=org_lengths,
         )
         if args.scheduler == "multiprocessing":
             logger.info("Running jobs with multiprocessing")
@@ -570,7 +576,9 @@ def calculate_anim(infiles, org_lengths):
 
     # Process resulting .delta files
     logger.info("Processing NUCmer .delta files.")
-    results = anim.process_deltadir(deltadir, org_lengths, logger=logger)
+    results = anim.process_deltadir(
+        deltadir, org_lengths, logger=logger, workers=args.workers
+    )
     if results.zero_error:  # zero percentage identity error
         if not args.skip_nucmer and args.scheduler == "multiprocessing":
             if 0 < cumval:
@@ -674,7 +682,7 @@ def unified_anib(infiles, org_lengths):
         logger.info("Fragmenting input files, and writing to %s", args.outdirname)
         # Fraglengths does not get reused with BLASTN
         fragfiles, fraglengths = anib.fragment_fasta_files(
-            infiles, blastdir, args.fragsize
+            infiles, blastdir, args.fragsize, workers=args.workers
         )
         # Export fragment lengths as JSON, in case we re-run with --skip_blastn
         with open(os.path.join(blastdir, "fraglengths.json"), "w") as outfile:
@@ -771,13 +779,27 @@ def write(results):
         results.to_csv(out_csv, index=True, sep="\t")
 
     else:
-        for dfr, filestem in results.data:
-            out_excel = os.path.join(args.outdirname, filestem) + ".xlsx"
-            out_csv = os.path.join(args.outdirname, filestem) + ".tab"
-            logger.info("\t%s", filestem)
-            if args.write_excel:
-                dfr.to_excel(out_excel, index=True)
-            dfr.to_csv(out_csv, index=True, sep="\t")
+        # Each result table goes to its own files, so they can be written
+        # concurrently
+        data = list(results.data)
+        workers = min(pyani_config.OUTPUT_WRITE_WORKERS, len(data))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            list(executor.map(lambda item: write_table(*item), data))
+
+
+# Write a single ANIb/ANIm result table
+def write_table(dfr, filestem):
+    """Write a single result dataframe to the output directory.
+
+    - dfr - dataframe to write
+    - filestem - filestem for the output files
+    """
+    out_excel = os.path.join(args.outdirname, filestem) + ".xlsx"
+    out_csv = os.path.join(args.outdirname, filestem) + ".tab"
+    logger.info("\t%s", filestem)
+    if args.write_excel:
+        dfr.to_excel(out_excel, index=True)
+    dfr.to_csv(out_csv, index=True, sep="\t")
 
 
 # Draw ANIb/ANIm/TETRA output
@@ -787,6 +809,11 @@ def draw(filestems, gformat):
     - filestems - filestems for output files
     - gformat - the format for output graphics
     """
+    # Read labels and classes once; each heatmap gets its own copy, as
+    # drawing may add entries for unlabelled sequences
+    labels = pyani_tools.get_labels(args.labels)
+    classes = pyani_tools.get_labels(args.classes)
+
     # Draw heatmaps
     for filestem in filestems:
         fullstem = os.path.join(args.outdirname, filestem)
@@ -795,9 +822,7 @@ def draw(filestems, gformat):
         df = pd.read_csv(infilename, index_col=0, sep="\t")
         logger.info("Writing heatmap to %s", outfilename)
         params = pyani_graphics.Params(
-            params_mpl(df)[filestem],
-            pyani_tools.get_labels(args.labels),
-            pyani_tools.get_labels(args.classes),
+            params_mpl(df)[filestem], dict(labels), dict(classes)
         )
         if args.gmethod == "mpl":
             pyani_graphics.heatmap_mpl(
@@ -875,19 +900,13 @@ if __name__ == "__main__":
         err_handler.setLevel(logging.WARNING)
     logger.addHandler(err_handler)
 
-    # Report arguments, if verbose
+    # Report arguments, if verbose. Input and output directories are
+    # required arguments, so argparse has already checked for them.
     logger.info("pyani version: %s", VERSION)
     logger.info(args)
     logger.info("command-line: %s", " ".join(sys.argv))
-
-    # Have we got an input and output directory? If not, exit.
-    if args.indirname is None:
-        logger.error("No input directory name (exiting)")
-        sys.exit(1)
     logger.info("Input directory: %s", args.indirname)
-    if args.outdirname is None:
-        logger.error("No output directory name (exiting)")
-        sys.exit(1)
+
     if args.rerender:  # Rerendering, we want to overwrite graphics
         args.force, args.noclobber = True, True
     make_outdir()
@@ -895,9 +914,13 @@ if __name__ == "__main__":
 
     # Check for the presence of space characters in any of the input filenames
     # or output directory. If we have any, abort here and now.
-    filenames = [args.outdirname] + os.listdir(args.indirname)
+    # The directory paths are checked once; input files only by name, as
+    # joining each name to its directory would only repeat that check.
+    filenames = [os.path.abspath(args.outdirname), os.path.abspath(args.indirname)]
+    with os.scandir(args.indirname) as entries:
+        filenames.extend(entry.name for entry in entries)
     for fname in filenames:
-        if " " in os.path.abspath(fname):
+        if " " in fname:
             logger.error("File or directory '%s' contains whitespace", fname)
             logger.error("This will cause issues with MUMmer and BLAST")
             logger.error("(exiting)")
@@ -941,7 +964,6 @@ if __name__ == "__main__":
         # Get input files
         logger.info("Identifying FASTA files in %s", args.indirname)
         infiles = pyani_files.get_fasta_files(args.indirname, recurse=True)
-        print(f"infiles: {infiles}")
         logger.info("Input files:\n\t%s", "\n\t".join(infiles))
 
         # Are we subsampling? If so, make the selection here
@@ -951,7 +973,11 @@ if __name__ == "__main__":
 
         # Get lengths of input sequences
         logger.info("Processing input sequence lengths")
-        org_lengths = pyani_files.get_sequence_lengths(infiles)
+        org_lengths = pyani_files.get_sequence_lengths_cached(
+            infiles,
+            os.path.join(args.outdirname, ".seqlen_cache"),
+            workers=args.workers,
+        )
         logger.info(
             "Sequence lengths:\n"
             + os.linesep.join(
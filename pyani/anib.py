@@ -86,9 +86,12 @@ THE SOFTWARE.
 import os
 import shutil
 
+from itertools import combinations
+
 import pandas as pd
 
 from Bio import SeqIO
+from Bio.SeqIO.FastaIO import SimpleFastaParser
 
 from . import pyani_config
 from . import pyani_files
@@ -97,12 +100,13 @@ from .pyani_tools import ANIResults, BLASTcmds, BLASTexes, BLASTfunctions
 
 
 # Divide input FASTA sequences into fragments
-def fragment_fasta_files(infiles, outdirname, fragsize):
+def fragment_fasta_files(infiles, outdirname, fragsize, workers=None):
     """Chops sequences of the passed files into fragments, returns filenames.
 
     - infiles - paths to each input sequence file
     - outdirname - path to output directory
     - fragsize - the size of sequence fragments
+    - workers - number of worker processes (defaults to the number of cores)
 
     Takes every sequence from every file in infiles, and splits them into
     consecutive fragments of length fragsize, (with any trailing sequences
@@ -111,23 +115,45 @@ def fragment_fasta_files(infiles, outdirname, fragsize):
     All fragments are named consecutively and uniquely (within a file) as
     fragNNNNN. Sequence description fields are retained.
     """
-    outfnames = []
-    for fname in infiles:
-        outstem, outext = os.path.splitext(os.path.split(fname)[-1])
-        outfname = os.path.join(outdirname, outstem) + "-fragments" + outext
-        outseqs = []
-        count = 0
-        for seq in SeqIO.parse(fname, "fasta"):
-            idx = 0
-            while idx < len(seq):
-                count += 1
-                newseq = seq[idx : idx + fragsize]
-                newseq.id = "frag%05d" % count
-                outseqs.append(newseq)
-                idx += fragsize
-        outfnames.append(outfname)
-        SeqIO.write(outseqs, outfname, "fasta")
-    return outfnames, get_fraglength_dict(outfnames)
+    fragments = pyani_files.map_files(
+        _fragment_fasta_file, infiles, outdirname, fragsize, workers=workers
+    )
+    outfnames = [outfname for outfname, _ in fragments]
+    fraglength_dict = {
+        os.path.split(outfname)[-1].split("-fragments")[0]: fraglengths
+        for outfname, fraglengths in fragments
+    }
+    return outfnames, fraglength_dict
+
+
+# Divide the sequences of a single input FASTA file into fragments
+def _fragment_fasta_file(fname, outdirname, fragsize):
+    """Returns (output filename, fragment lengths) for one fragmented file.
+
+    - fname - path to the input sequence file
+    - outdirname - path to output directory
+    - fragsize - the size of sequence fragments
+
+    Fragment lengths are keyed by fragment ID, as for get_fragment_lengths(),
+    but are recorded as the fragments are made so the output need not be
+    parsed again.
+    """
+    outstem, outext = os.path.splitext(os.path.split(fname)[-1])
+    outfname = os.path.join(outdirname, outstem) + "-fragments" + outext
+    outseqs = []
+    fraglengths = {}
+    count = 0
+    for seq in SeqIO.parse(fname, "fasta"):
+        idx = 0
+        while idx < len(seq):
+            count += 1
+            newseq = seq[idx : idx + fragsize]
+            newseq.id = "frag%05d" % count
+            outseqs.append(newseq)
+            fraglengths[newseq.id] = len(newseq)
+            idx += fragsize
+    SeqIO.write(outseqs, outfname, "fasta")
+    return outfname, fraglengths
 
 
 # Get lengths of all sequences in all files
@@ -151,14 +177,16 @@ def get_fraglength_dict(fastafiles):
 def get_fragment_lengths(fastafile):
     """Returns dictionary of sequence fragment lengths, keyed by fragment ID.
 
-    Biopython's SeqIO module is used to parse all sequences in the FASTA
-    file.
+    Biopython's SimpleFastaParser is used to read each header and sequence
+    as plain strings, without building a SeqRecord for every fragment. The
+    fragment ID is the first word of the header, as for SeqIO.
 
     NOTE: ambiguity symbols are not discounted.
     """
     fraglengths = {}
-    for seq in SeqIO.parse(fastafile, "fasta"):
-        fraglengths[seq.id] = len(seq)
+    with open(fastafile, "r") as ifh:
+        for title, seq in SimpleFastaParser(ifh):
+            fraglengths[title.split(None, 1)[0]] = len(seq)
     return fraglengths
 
 
@@ -225,22 +253,22 @@ def make_job_graph(infiles, fragfiles, blastcmds):
 
     # Create list of BLAST executable jobs, with dependencies
     jobnum = len(dbjobdict)
-    for idx, fname1 in enumerate(fragfiles[:-1]):
-        for fname2 in fragfiles[idx + 1 :]:
-            jobnum += 1
-            jobs = [
-                pyani_jobs.Job(
-                    "%s_exe_%06d_a" % (blastcmds.prefix, jobnum),
-                    blastcmds.build_blast_cmd(fname1, fname2.replace("-fragments", "")),
-                ),
-                pyani_jobs.Job(
-                    "%s_exe_%06d_b" % (blastcmds.prefix, jobnum),
-                    blastcmds.build_blast_cmd(fname2, fname1.replace("-fragments", "")),
-                ),
-            ]
-            jobs[0].add_dependency(dbjobdict[fname1.replace("-fragments", "")])
-            jobs[1].add_dependency(dbjobdict[fname2.replace("-fragments", "")])
-            joblist.extend(jobs)
+    for fname1, fname2 in combinations(fragfiles, 2):
+        jobnum += 1
+        jobs = [
+            pyani_jobs.Job(
+                "%s_exe_%06d_a" % (blastcmds.prefix, jobnum),
+                blastcmds.build_blast_cmd(fname1, fname2.replace("-fragments", "")),
+            ),
+            pyani_jobs.Job(
+                "%s_exe_%06d_b" % (blastcmds.prefix, jobnum),
+                blastcmds.build_blast_cmd(fname2, fname1.replace("-fragments", "")),
+            ),
+        ]
+        # Each BLAST job waits on the database it searches
+        jobs[0].add_dependency(dbjobdict[fname2.replace("-fragments", "")])
+        jobs[1].add_dependency(dbjobdict[fname1.replace("-fragments", "")])
+        joblist.extend(jobs)
 
     # Return the dependency graph
     return joblist
@@ -320,20 +348,15 @@ def generate_blastn_commands(filenames, outdir, blast_exe=None, mode="ANIb"):
     else:
         construct_blast_cmdline = construct_blastall_cmdline
     cmdlines = []
-    for idx, fname1 in enumerate(filenames[:-1]):
+    for fname1, fname2 in combinations(filenames, 2):
         dbname1 = fname1.replace("-fragments", "")
-        for fname2 in filenames[idx + 1 :]:
-            dbname2 = fname2.replace("-fragments", "")
-            if blast_exe is None:
-                cmdlines.append(construct_blast_cmdline(fname1, dbname2, outdir))
-                cmdlines.append(construct_blast_cmdline(fname2, dbname1, outdir))
-            else:
-                cmdlines.append(
-                    construct_blast_cmdline(fname1, dbname2, outdir, blast_exe)
-                )
-                cmdlines.append(
-                    construct_blast_cmdline(fname2, dbname1, outdir, blast_exe)
-                )
+        dbname2 = fname2.replace("-fragments", "")
+        if blast_exe is None:
+            cmdlines.append(construct_blast_cmdline(fname1, dbname2, outdir))
+            cmdlines.append(construct_blast_cmdline(fname2, dbname1, outdir))
+        else:
+            cmdlines.append(construct_blast_cmdline(fname1, dbname2, outdir, blast_exe))
+            cmdlines.append(construct_blast_cmdline(fname2, dbname1, outdir, blast_exe))
     return cmdlines
 
 
@@ -416,8 +439,7 @@ def process_blast(
     results = ANIResults(list(org_lengths.keys()), mode)
 
     # Fill diagonal NA values for alignment_length with org_lengths
-    for org, length in list(org_lengths.items()):
-        results.alignment_lengths[org][org] = length
+    results.add_org_lengths(org_lengths)
 
     # Process .blast_tab files assuming that the filename format holds:
     # org1_vs_org2.blast_tab:
@@ -426,14 +448,14 @@ def process_blast(
 
         # We may have BLAST files from other analyses in the same directory
         # If this occurs, we raise a warning, and skip the file
-        if qname not in list(org_lengths.keys()):
+        if qname not in org_lengths:
             if logger:
                 logger.warning(
                     "Query name %s not in input " % qname
                     + "sequence list, skipping %s" % blastfile
                 )
             continue
-        if sname not in list(org_lengths.keys()):
+        if sname not in org_lengths:
             if logger:
                 logger.warning(
                     "Subject name %s not in input " % sname
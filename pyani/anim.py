@@ -23,6 +23,10 @@ percentage (of whole genome) for each pairwise comparison.
 
 import os
 
+from itertools import combinations
+
+import numpy as np
+
 from . import pyani_config
 from . import pyani_files
 from . import pyani_jobs
@@ -37,6 +41,7 @@ def generate_nucmer_jobs(
     filter_exe=pyani_config.FILTER_DEFAULT,
     maxmatch=False,
     jobprefix="ANINUCmer",
+    org_lengths=None,
 ):
     """Return a list of Jobs describing NUCmer command-lines for ANIm
 
@@ -44,17 +49,35 @@ def generate_nucmer_jobs(
     - outdir - path to output directory
     - nucmer_exe - location of the nucmer binary
     - maxmatch - Boolean flag indicating to use NUCmer's -maxmatch option
+    - org_lengths - dictionary of total sequence lengths, keyed by sequence
+      (optional)
 
     Loop over all FASTA files, generating Jobs describing NUCmer command lines
     for each pairwise comparison.
+
+    If org_lengths is provided, Jobs are ordered by the combined length of
+    the sequences being compared, largest first, so that the longest-running
+    comparisons do not start last and leave the other workers idle. The
+    query and subject of each comparison are unchanged. Only the
+    multiprocessing scheduler keeps this order: run_sge.build_joblist()
+    collects jobs into a set, so SGE submission ignores it.
     """
     ncmds, fcmds = generate_nucmer_commands(
         filenames, outdir, nucmer_exe, filter_exe, maxmatch
     )
+    order = range(len(ncmds))
+    if org_lengths is not None:
+        # Commands are generated in the order of combinations(filenames, 2)
+        stems = [os.path.splitext(os.path.split(fname)[-1])[0] for fname in filenames]
+        sizes = [
+            org_lengths[stem1] + org_lengths[stem2]
+            for stem1, stem2 in combinations(stems, 2)
+        ]
+        order = sorted(order, key=lambda idx: -sizes[idx])
     joblist = []
-    for idx, ncmd in enumerate(ncmds):
-        njob = pyani_jobs.Job("%s_%06d-n" % (jobprefix, idx), ncmd)
-        fjob = pyani_jobs.Job("%s_%06d-f" % (jobprefix, idx), fcmds[idx])
+    for idx, cmdidx in enumerate(order):
+        njob = pyani_jobs.Job("%s_%06d-n" % (jobprefix, idx), ncmds[cmdidx])
+        fjob = pyani_jobs.Job("%s_%06d-f" % (jobprefix, idx), fcmds[cmdidx])
         fjob.add_dependency(njob)
         # joblist.append(njob)  # not required: dependency in fjob
         joblist.append(fjob)
@@ -86,13 +109,12 @@ def generate_nucmer_commands(
     pairwise comparison.
     """
     nucmer_cmdlines, delta_filter_cmdlines = [], []
-    for idx, fname1 in enumerate(filenames[:-1]):
-        for fname2 in filenames[idx + 1 :]:
-            ncmd, dcmd = construct_nucmer_cmdline(
-                fname1, fname2, outdir, nucmer_exe, filter_exe, maxmatch
-            )
-            nucmer_cmdlines.append(ncmd)
-            delta_filter_cmdlines.append(dcmd)
+    for fname1, fname2 in combinations(filenames, 2):
+        ncmd, dcmd = construct_nucmer_cmdline(
+            fname1, fname2, outdir, nucmer_exe, filter_exe, maxmatch
+        )
+        nucmer_cmdlines.append(ncmd)
+        delta_filter_cmdlines.append(dcmd)
     return (nucmer_cmdlines, delta_filter_cmdlines)
 
 
@@ -153,24 +175,30 @@ def parse_delta(filename):
     Extracts the aligned length and number of similarity errors for each
     aligned uniquely-matched region, and returns the cumulative total for
     each as a tuple.
+
+    Alignment lines are picked out with a string method, and their values
+    are converted and summed by NumPy, rather than in a Python loop.
     """
-    aln_length, sim_errors = 0, 0
-    for line in [l.strip().split() for l in open(filename, "r").readlines()]:
-        if line[0] == "NUCMER" or line[0].startswith(">"):  # Skip headers
-            continue
-        # We only process lines with seven columns:
-        if len(line) == 7:
-            aln_length += abs(int(line[1]) - int(line[0]))
-            sim_errors += int(line[4])
+    # We only process lines with seven space-separated columns; header
+    # lines (file paths, NUCMER, and >sequence lines) have fewer
+    with open(filename, "r") as ifh:
+        aligns = [line for line in ifh.read().split("\n") if line.count(" ") == 6]
+    if not aligns:
+        return 0, 0
+    values = np.fromstring(" ".join(aligns), dtype=np.int64, sep=" ").reshape(-1, 7)
+    aln_length = int(np.abs(values[:, 1] - values[:, 0]).sum())
+    sim_errors = int(values[:, 4].sum())
     return aln_length, sim_errors
 
 
 # Parse all the .delta files in the passed directory
-def process_deltadir(delta_dir, org_lengths, logger=None):
+def process_deltadir(delta_dir, org_lengths, logger=None, workers=None):
     """Returns a tuple of ANIm results for .deltas in passed directory.
 
     - delta_dir - path to the directory containing .delta files
     - org_lengths - dictionary of total sequence lengths, keyed by sequence
+    - logger - a logger module logger (optional)
+    - workers - number of worker processes (defaults to the number of cores)
 
     Returns the following pandas dataframes in an ANIResults object;
     query sequences are rows, subject sequences are columns:
@@ -191,54 +219,73 @@ def process_deltadir(delta_dir, org_lengths, logger=None):
     results = ANIResults(list(org_lengths.keys()), "ANIm")
 
     # Fill diagonal NA values for alignment_length with org_lengths
-    for org, length in list(org_lengths.items()):
-        results.alignment_lengths[org][org] = length
+    results.add_org_lengths(org_lengths)
 
     # Process .delta files assuming that the filename format holds:
     # org1_vs_org2.delta
+    comparisons = []
     for deltafile in deltafiles:
         qname, sname = os.path.splitext(os.path.split(deltafile)[-1])[0].split("_vs_")
 
         # We may have .delta files from other analyses in the same directory
         # If this occurs, we raise a warning, and skip the .delta file
-        if qname not in list(org_lengths.keys()):
+        if qname not in org_lengths:
             if logger:
                 logger.warning(
                     "Query name %s not in input " % qname
                     + "sequence list, skipping %s" % deltafile
                 )
             continue
-        if sname not in list(org_lengths.keys()):
+        if sname not in org_lengths:
             if logger:
                 logger.warning(
                     "Subject name %s not in input " % sname
                     + "sequence list, skipping %s" % deltafile
                 )
             continue
-        tot_length, tot_sim_error = parse_delta(deltafile)
-        if tot_length == 0 and logger is not None:
-            if logger:
+        comparisons.append((deltafile, qname, sname))
+    if not comparisons:
+        return results
+
+    # Parse the .delta files in parallel, then calculate coverage and
+    # identity for all comparisons at once
+    parsed = pyani_files.map_files(
+        parse_delta, [deltafile for deltafile, _, _ in comparisons], workers=workers
+    )
+    tot_lengths = np.array([length for length, _ in parsed], dtype=float)
+    tot_sim_errors = np.array([errors for _, errors in parsed], dtype=float)
+    query_covers = tot_lengths / np.array(
+        [org_lengths[qname] for _, qname, _ in comparisons], dtype=float
+    )
+    sbjct_covers = tot_lengths / np.array(
+        [org_lengths[sname] for _, _, sname in comparisons], dtype=float
+    )
+
+    # Calculate percentage ID of aligned length. This is undefined if
+    # total length is zero, in which case we set an arbitrary value of
+    # zero identity and flag the error.
+    # Common causes are that a NUCmer run failed, or that a very
+    # distant sequence was included in the analysis.
+    zero_length = tot_lengths == 0
+    if zero_length.any():
+        results.zero_error = True
+        if logger:
+            for idx in np.flatnonzero(zero_length):
                 logger.warning(
-                    "Total alignment length reported in " + "%s is zero!" % deltafile
+                    "Total alignment length reported in "
+                    + "%s is zero!" % comparisons[idx][0]
                 )
-        query_cover = float(tot_length) / org_lengths[qname]
-        sbjct_cover = float(tot_length) / org_lengths[sname]
-
-        # Calculate percentage ID of aligned length. This may fail if
-        # total length is zero.
-        # The ZeroDivisionError that would arise should be handled
-        # Common causes are that a NUCmer run failed, or that a very
-        # distant sequence was included in the analysis.
-        try:
-            perc_id = 1 - float(tot_sim_error) / tot_length
-        except ZeroDivisionError:
-            perc_id = 0  # set arbitrary value of zero identity
-            results.zero_error = True
-
-        # Populate dataframes: when assigning data from symmetrical MUMmer
-        # output, both upper and lower triangles will be populated
+    perc_ids = np.zeros_like(tot_lengths)
+    np.divide(tot_sim_errors, tot_lengths, out=perc_ids, where=~zero_length)
+    perc_ids = np.where(zero_length, 0, 1 - perc_ids)
+
+    # Populate dataframes: when assigning data from symmetrical MUMmer
+    # output, both upper and lower triangles will be populated
+    for idx, ((_, qname, sname), (tot_length, tot_sim_error)) in enumerate(
+        zip(comparisons, parsed)
+    ):
         results.add_tot_length(qname, sname, tot_length)
         results.add_sim_errors(qname, sname, tot_sim_error)
-        results.add_pid(qname, sname, perc_id)
-        results.add_coverage(qname, sname, query_cover, sbjct_cover)
+        results.add_pid(qname, sname, perc_ids[idx])
+        results.add_coverage(qname, sname, query_covers[idx], sbjct_covers[idx])
     return results
@@ -47,6 +47,11 @@ FRAGSIZE = 1020  # Default ANIb fragment size
 
 # SGE/OGE scheduler parameters
 SGE_WAIT = 0.01  # Base unit of time (s) to wait between polling SGE
+SGE_SUBMIT_WORKERS = 32  # Maximum threads for job script writes/qsub calls
+
+# Parallel processing parameters
+MIN_PARALLEL_FILES = 4  # Fewest files for which per-file work uses a process pool
+OUTPUT_WRITE_WORKERS = 8  # Maximum threads for writing result tables
 
 # Custom Matplotlib colourmaps
 # 1a) Map for species boundaries (95%: 0.95), blue for values at
@@ -7,9 +7,22 @@
 
 """Code to help handle files for average nucleotide identity calculations."""
 
+import json
+import mmap
 import os
 
-from Bio import SeqIO
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+
+from . import pyani_config
+
+# File extensions recognised as FASTA format input
+FASTA_EXTENSIONS = (".fasta", ".fas", ".fa", ".fna", ".fsa_nt")
+
+# Slice size (bytes) used when counting bases in FASTA files, and the
+# characters that are not counted as bases
+FASTA_BUFFER_SIZE = 1 << 20
+FASTA_WHITESPACE = b" \t\r\n"
 
 
 # Get a list of FASTA files from the input directory
@@ -19,9 +32,7 @@ def get_fasta_files(dirname, recurse=False):
     - dirname - path to input directory
     - recurse - if True, recurse into subdirectories
     """
-    infiles = get_input_files(
-        dirname, ".fasta", ".fas", ".fa", ".fna", ".fsa_nt", recurse=recurse
-    )
+    infiles = get_input_files(dirname, *FASTA_EXTENSIONS, recurse=recurse)
     return infiles
 
 
@@ -32,37 +43,181 @@ def get_input_files(dirname, *ext, recurse=False):
     - dirname - path to input directory
     - recurse - if True, recurse into subdirectories
     - *ext - list of arguments describing permitted file extensions
+
+    os.scandir() is used so that each directory is listed only once, and
+    file type checks can use the information returned with each directory
+    entry, rather than a further stat call. Extensions are checked with a
+    single str.endswith() call per entry. Subdirectories are visited in
+    the same (top-down) order as os.walk(), and symlinks to directories
+    are not followed. As with os.walk(), subdirectories that cannot be
+    listed are skipped.
     """
+    ext = tuple(ext)
     files = []
-    if recurse:
-        for root, dirnames, filenames in os.walk(dirname):
-            print([os.path.join(root, _) for _ in filenames])
-            files.extend(
-                [
-                    os.path.join(root, _)
-                    for _ in filenames
-                    if os.path.splitext(_)[-1] in ext
-                ]
-            )
-    else:
-        filelist = [f for f in os.listdir(dirname) if os.path.splitext(f)[-1] in ext]
-        files = [os.path.join(dirname, f) for f in filelist]
+    dirnames = [dirname]
+    while dirnames:
+        path = dirnames.pop()
+        try:
+            entries = os.scandir(path)
+        except OSError:
+            if path == dirname:  # Only an unreadable input dir is an error
+                raise
+            continue
+        subdirs = []
+        with entries:
+            for entry in entries:
+                if entry.is_file():
+                    if entry.name.endswith(ext):
+                        files.append(entry.path)
+                elif recurse and entry.is_dir(follow_symlinks=False):
+                    subdirs.append(entry.path)
+        dirnames.extend(reversed(subdirs))
     return files
 
 
+# Get total base count for a single FASTA file
+def _count_fasta_bases(filename):
+    """Returns the total number of bases in all sequences of a FASTA file.
+
+    - filename - path to the FASTA file
+
+    The file is memory-mapped, and header lines located with mmap.find(),
+    so that the Python-level loop runs once per sequence rather than once
+    per line. The sequence between headers is counted in slices of
+    FASTA_BUFFER_SIZE bytes, with whitespace removed, so that very large
+    genomes need not be read into memory. As with Biopython's
+    SimpleFastaParser, any text before the first header line is ignored.
+    """
+    total = 0
+    with open(filename, "rb") as handle:
+        size = os.fstat(handle.fileno()).st_size
+        if size == 0:  # empty files cannot be memory-mapped
+            return total
+        with mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ) as fmap:
+            # Find the first header line
+            if fmap[:1] == b">":
+                header = 0
+            else:
+                header = fmap.find(b"\n>")
+                header = header + 1 if header != -1 else -1
+            while header != -1:
+                seqstart = fmap.find(b"\n", header)
+                if seqstart == -1:  # final header, with no sequence
+                    break
+                nextheader = fmap.find(b"\n>", seqstart)
+                seqend = size if nextheader == -1 else nextheader
+                for pos in range(seqstart + 1, seqend, FASTA_BUFFER_SIZE):
+                    chunk = fmap[pos : min(pos + FASTA_BUFFER_SIZE, seqend)]
+                    total += len(chunk.translate(None, FASTA_WHITESPACE))
+                header = nextheader + 1 if nextheader != -1 else -1
+    return total
+
+
+# Apply a function to each of several files, in parallel if worthwhile
+def map_files(func, filenames, *args, workers=None):
+    """Returns a list of func(filename, *args), one per passed file.
+
+    - func - module-level function taking a file path as its first argument
+    - filenames - paths to the files to process
+    - args - further arguments, passed to func for every file
+    - workers - number of worker processes (defaults to the number of cores)
+
+    Per-file parsing is CPU-bound and holds the GIL, so threads would not
+    help; each file is processed in a worker process instead. For fewer
+    than pyani_config.MIN_PARALLEL_FILES files, or a single worker, the
+    cost of a process pool outweighs the benefit, and files are processed
+    serially.
+    """
+    filenames = list(filenames)
+    workers = workers or os.cpu_count() or 1
+    if len(filenames) < pyani_config.MIN_PARALLEL_FILES or workers == 1:
+        return [func(fname, *args) for fname in filenames]
+    chunksize = max(1, len(filenames) // (4 * workers))
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(
+            executor.map(
+                func,
+                filenames,
+                *(repeat(arg) for arg in args),
+                chunksize=chunksize,
+            )
+        )
+
+
 # Get lengths of input sequences
-def get_sequence_lengths(fastafilenames):
+def get_sequence_lengths(fastafilenames, workers=None):
     """Returns dictionary of sequence lengths, keyed by organism.
 
-    Biopython's SeqIO module is used to parse all sequences in the FASTA
-    file corresponding to each organism, and the total base count in each
-    is obtained.
+    - fastafilenames - paths to input FASTA files
+    - workers - number of worker processes (defaults to the number of cores)
+
+    All sequences in the FASTA file corresponding to each organism are
+    read, and the total base count in each is obtained. Bases are counted
+    directly from the file contents, without constructing a SeqRecord or
+    sequence string for each sequence. Files are parsed in parallel when
+    there are enough of them.
 
     NOTE: ambiguity symbols are not discounted.
     """
-    tot_lengths = {}
-    for fn in fastafilenames:
-        tot_lengths[os.path.splitext(os.path.split(fn)[-1])[0]] = sum(
-            [len(s) for s in SeqIO.parse(fn, "fasta")]
+    return {
+        os.path.splitext(os.path.split(fn)[-1])[0]: length
+        for fn, length in zip(
+            fastafilenames,
+            map_files(_count_fasta_bases, fastafilenames, workers=workers),
         )
-    return tot_lengths
+    }
+
+
+# Get lengths of input sequences, reusing values cached from earlier runs
+def get_sequence_lengths_cached(fastafilenames, cache_path, workers=None):
+    """Returns dictionary of sequence lengths, keyed by organism.
+
+    - fastafilenames - paths to input FASTA files
+    - cache_path - path to JSON file holding lengths from previous runs
+    - workers - number of worker processes (defaults to the number of cores)
+
+    Lengths are cached against the absolute path, modification time and
+    size of each input file. Files whose cached entry still matches are not
+    parsed again; all other files are parsed as in get_sequence_lengths(),
+    and the cache is rewritten. A missing, unreadable or malformed cache
+    (anything but a dictionary of [mtime, size, length] lists) is ignored.
+
+    average_nucleotide_identity.py keeps this cache in its output
+    directory, which is removed or refused unless -f/--force is given, so
+    the cache is only reused by runs with both --force and --noclobber.
+    """
+    try:
+        with open(cache_path, "r") as ifh:
+            cache = json.load(ifh)
+    except (OSError, ValueError):
+        cache = {}
+    if not isinstance(cache, dict) or not all(
+        isinstance(entry, list) and len(entry) == 3 for entry in cache.values()
+    ):
+        cache = {}
+
+    # Identify files with no valid cache entry, and parse only those
+    keys, missing = {}, []
+    for fn in fastafilenames:
+        abspath = os.path.abspath(fn)
+        fstat = os.stat(abspath)
+        keys[fn] = (abspath, [fstat.st_mtime_ns, fstat.st_size])
+        entry = cache.get(abspath)
+        if entry is None or entry[:2] != keys[fn][1]:
+            missing.append(fn)
+    lengths = map_files(_count_fasta_bases, missing, workers=workers)
+    for fn, length in zip(missing, lengths):
+        abspath, key = keys[fn]
+        cache[abspath] = key + [length]
+
+    # Write to a temporary file and move it into place, so that an
+    # interrupted run cannot leave a truncated cache behind
+    if missing:
+        tmppath = cache_path + ".tmp"
+        with open(tmppath, "w") as ofh:
+            json.dump(cache, ofh)
+        os.replace(tmppath, cache_path)
+    return {
+        os.path.splitext(os.path.split(fn)[-1])[0]: cache[keys[fn][0]][2]
+        for fn in fastafilenames
+    }
@@ -7,57 +7,94 @@
 
 """Code to support pyani."""
 
+import numpy as np
 import pandas as pd
 from . import pyani_config
 
 
 # Class to hold ANI dataframe results
 class ANIResults(object):
-    """Holds ANI dataframe results."""
+    """Holds ANI dataframe results.
+
+    Values are held in NumPy arrays, indexed by the position of each label,
+    and presented as labelled dataframes on access. Adding a value is then
+    a dictionary lookup and an array assignment, rather than a pandas
+    label-based .loc assignment, which matters with N^2 comparisons.
+    """
 
     def __init__(self, labels, mode):
-        """Initialise with four empty, labelled dataframes."""
-        self.alignment_lengths = pd.DataFrame(index=labels, columns=labels, dtype=float)
-        self.similarity_errors = pd.DataFrame(
-            index=labels, columns=labels, dtype=float
-        ).fillna(0)
-        self.percentage_identity = pd.DataFrame(
-            index=labels, columns=labels, dtype=float
-        ).fillna(1.0)
-        self.alignment_coverage = pd.DataFrame(
-            index=labels, columns=labels, dtype=float
-        ).fillna(1.0)
+        """Initialise with four empty, labelled arrays."""
+        self.labels = list(labels)
+        self._positions = {label: idx for idx, label in enumerate(self.labels)}
+        size = (len(self.labels), len(self.labels))
+        self._alignment_lengths = np.full(size, np.nan)
+        self._similarity_errors = np.zeros(size)
+        self._percentage_identity = np.ones(size)
+        self._alignment_coverage = np.ones(size)
         self.zero_error = False
         self.mode = mode
 
+    def _frame(self, values):
+        """Return the passed array as a dataframe labelled by sequence."""
+        return pd.DataFrame(values, index=self.labels, columns=self.labels)
+
+    def _set(self, values, qname, sname, value, sym):
+        """Set values[qname, sname], and values[sname, qname] if sym."""
+        qidx, sidx = self._positions[qname], self._positions[sname]
+        values[qidx, sidx] = value
+        if sym:
+            values[sidx, qidx] = value
+
+    @property
+    def alignment_lengths(self):
+        """Return dataframe of total alignment lengths."""
+        return self._frame(self._alignment_lengths)
+
+    @property
+    def similarity_errors(self):
+        """Return dataframe of similarity error counts."""
+        return self._frame(self._similarity_errors)
+
+    @property
+    def percentage_identity(self):
+        """Return dataframe of percentage identities."""
+        return self._frame(self._percentage_identity)
+
+    @property
+    def alignment_coverage(self):
+        """Return dataframe of alignment coverage."""
+        return self._frame(self._alignment_coverage)
+
     def add_tot_length(self, qname, sname, value, sym=True):
         """Add a total length value to self.alignment_lengths."""
-        self.alignment_lengths.loc[qname, sname] = value
-        if sym:
-            self.alignment_lengths.loc[sname, qname] = value
+        self._set(self._alignment_lengths, qname, sname, value, sym)
+
+    def add_org_lengths(self, org_lengths):
+        """Set the self.alignment_lengths diagonal from sequence lengths.
+
+        - org_lengths - dictionary of total sequence lengths, keyed by label
+        """
+        idx = [self._positions[org] for org in org_lengths]
+        self._alignment_lengths[idx, idx] = list(org_lengths.values())
 
     def add_sim_errors(self, qname, sname, value, sym=True):
         """Add a similarity error value to self.similarity_errors."""
-        self.similarity_errors.loc[qname, sname] = value
-        if sym:
-            self.similarity_errors.loc[sname, qname] = value
+        self._set(self._similarity_errors, qname, sname, value, sym)
 
     def add_pid(self, qname, sname, value, sym=True):
         """Add a percentage identity value to self.percentage_identity."""
-        self.percentage_identity.loc[qname, sname] = value
-        if sym:
-            self.percentage_identity.loc[sname, qname] = value
+        self._set(self._percentage_identity, qname, sname, value, sym)
 
     def add_coverage(self, qname, sname, qcover, scover=None):
         """Add percentage coverage values to self.alignment_coverage."""
-        self.alignment_coverage.loc[qname, sname] = qcover
+        self._set(self._alignment_coverage, qname, sname, qcover, False)
         if scover:
-            self.alignment_coverage.loc[sname, qname] = scover
+            self._set(self._alignment_coverage, sname, qname, scover, False)
 
     @property
     def hadamard(self):
         """Return Hadamard matrix (identity * coverage)."""
-        return self.percentage_identity * self.alignment_coverage
+        return self._frame(self._percentage_identity * self._alignment_coverage)
 
     @property
     def data(self):
@@ -15,39 +15,90 @@ import multiprocessing
 import subprocess
 import sys
 
+from collections import defaultdict
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
 CUMRETVAL = 0
 
 
 # Run a job dependency graph with multiprocessing
 def run_dependency_graph(jobgraph, workers=None, logger=None):
-    """Creates and runs pools of jobs based on the passed jobgraph.
+    """Runs the passed jobgraph, starting each job once its dependencies finish.
 
     - jobgraph - list of jobs, which may have dependencies.
-    - verbose - flag for multiprocessing verbosity
+    - workers - number of worker processes (defaults to the number of cores)
     - logger - a logger module logger (optional)
 
-    The strategy here is to loop over each job in the list of jobs (jobgraph),
-    and create/populate a series of Sets of commands, to be run in
-    reverse order with multiprocessing_run as asynchronous pools.
-    """
-    cmdsets = []
-    for job in jobgraph:
-        cmdsets = populate_cmdsets(job, cmdsets, depth=1)
+    Each command line is started as soon as every command it depends on
+    has finished, rather than waiting for the whole of the previous layer
+    of the dependency tree, so (for instance) each delta-filter job can
+    run while other NUCmer comparisons are still in progress. As with
+    populate_cmdsets(), a command line shared by several jobs is run once.
 
-    # Put command sets in reverse order, and submit to multiprocessing_run
-    cmdsets.reverse()
+    Returns the sum of exit codes from each command that was run. Raises
+    ValueError if some commands could never be started, as with
+    run_sge.submit_jobs().
+    """
+    # Identify the commands each command depends on, walking the whole graph
+    # in jobgraph order, so that commands become ready in that order
+    cmd_deps = defaultdict(set)
+    stack, seen = list(reversed(jobgraph)), set()
+    while stack:
+        job = stack.pop()
+        if job in seen:
+            continue
+        seen.add(job)
+        cmd_deps[job.command].update(dep.command for dep in job.dependencies)
+        stack.extend(reversed(job.dependencies))
+    cmd_dependents = defaultdict(list)
+    for cmd, deps in cmd_deps.items():
+        for dep in deps:
+            cmd_dependents[dep].append(cmd)
+    remaining = {cmd: len(deps) for cmd, deps in cmd_deps.items()}
+
+    # Start every command with no outstanding dependencies, then release
+    # the commands depending on each as it completes
     cumretval = 0
-    for cmdset in cmdsets:
-        if logger:  # Try to be informative, if the logger module is being used
-            logger.info("Command pool now running:")
-            for cmd in cmdset:
-                logger.info(cmd)
-        cumretval += multiprocessing_run(cmdset, workers)
-        if logger:  # Try to be informative, if the logger module is being used
-            logger.info("Command pool done.")
+    running = {}
+    ready = [cmd for cmd, count in remaining.items() if not count]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while ready or running:
+            for cmd in ready:
+                if logger:  # Try to be informative, if the logger is being used
+                    logger.info("Command now running: %s", cmd)
+                running[executor.submit(run_command, cmd)] = cmd
+            ready = []
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                cmd = running.pop(future)
+                cumretval += future.result().returncode
+                for dependent in cmd_dependents[cmd]:
+                    remaining[dependent] -= 1
+                    if not remaining[dependent]:
+                        ready.append(dependent)
+
+    # Anything left over waits on a command that could never be run
+    blocked = sorted(cmd for cmd, count in remaining.items() if count)
+    if blocked:
+        raise ValueError("Commands could not be run (dependency cycle, or "
+                         "a command depending on itself): %s" %
+                         ", ".join(blocked))
+    if logger:  # Try to be informative, if the logger is being used
+        logger.info("All commands done.")
     return cumretval
 
 
+# Run a single command line, capturing its output
+def run_command(cmdline):
+    """Returns the CompletedProcess from running the passed command line."""
+    return subprocess.run(
+        str(cmdline),
+        shell=sys.platform != "win32",
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+
+
 def populate_cmdsets(job, cmdsets, depth):
     """Creates a list of sets containing jobs at different depths of the
     dependency tree.
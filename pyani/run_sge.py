@@ -11,30 +11,35 @@ For parallelisation on multi-node system, we use some custom code to submit
 jobs.
 """
 
-import itertools
+import logging
 import os
+import shlex
+import subprocess
 
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 
 from . import pyani_config
 from .pyani_jobs import JobGroup
 
 
-def split_seq(iterable, size):
-    """Splits a passed iterable into chunks of a given size."""
-    elm = iter(iterable)
-    item = list(itertools.islice(elm, size))
-    while item:
-        yield item
-        item = list(itertools.islice(elm, size))
-
-
 # Build a list of SGE jobs from a graph
 def build_joblist(jobgraph):
-    """Returns a list of jobs, from a passed jobgraph."""
+    """Returns a list of jobs, from a passed jobgraph.
+
+    The dependency graph is walked iteratively with an explicit stack, so
+    that deep graphs cannot exceed the recursion limit, and the
+    dependencies of each job are visited only once, however many jobs
+    share them.
+    """
     jobset = set()
-    for job in jobgraph:
-        jobset = populate_jobset(job, jobset, depth=1)
+    stack = list(jobgraph)
+    while stack:
+        job = stack.pop()
+        if job in jobset:
+            continue
+        jobset.add(job)
+        stack.extend(job.dependencies)
     return list(jobset)
 
 
@@ -45,13 +50,12 @@ def compile_jobgroups_from_joblist(joblist, jgprefix, sgegroupsize):
     for job in joblist:
         jobcmds[job.command.split(' ', 1)[0]].append(job.command)
     jobgroups = []
-    for cmds in list(jobcmds.items()):
-        # Break arglist up into batches of sgegroupsize (default: 10,000)
-        sublists = split_seq(cmds[1], sgegroupsize)
-        count = 0
-        for sublist in sublists:
-            count += 1
-            sge_jobcmdlist = ['\"%s\"' % jc for jc in sublist]
+    for cmdlist in jobcmds.values():
+        # Break arglist up into batches of sgegroupsize (default: 10,000),
+        # by slicing the list of commands directly
+        for count, start in enumerate(range(0, len(cmdlist), sgegroupsize), 1):
+            sge_jobcmdlist = ['\"%s\"' % jc for jc in
+                              cmdlist[start:start + sgegroupsize]]
             jobgroups.append(JobGroup("%s_%d" % (jgprefix, count),
                                       "$cmds",
                                       arguments={'cmds': sge_jobcmdlist}))
@@ -81,16 +85,17 @@ def run_dependency_graph(jobgraph, logger=None, jgprefix="ANIm_SGE_JG",
     """
     joblist = build_joblist(jobgraph)
 
-    # Try to be informative by telling the user what jobs will run
-    dep_count = 0  # how many dependencies are there
-    if logger:
-        logger.info("Jobs to run with scheduler")
+    # Try to be informative by telling the user what jobs will run. The
+    # listing is logged as a single message, and only built if it will be
+    # logged, as there may be many thousands of jobs.
+    dep_count = sum(len(job.dependencies) for job in joblist)
+    if logger and logger.isEnabledFor(logging.INFO):
+        lines = ["Jobs to run with scheduler"]
         for job in joblist:
-            logger.info("{0}: {1}".format(job.name, job.command))
-            if len(job.dependencies):
-                dep_count += len(job.dependencies)
-                for dep in job.dependencies:
-                    logger.info("\t[^ depends on: %s]" % dep.name)
+            lines.append("{0}: {1}".format(job.name, job.command))
+            lines.extend(["\t[^ depends on: %s]" % dep.name for dep in
+                          job.dependencies])
+        logger.info("\n".join(lines))
     logger.info("There are %d job dependencies" % dep_count)
 
     # If there are no job dependencies, we can use an array (or series of
@@ -103,27 +108,15 @@ def run_dependency_graph(jobgraph, logger=None, jgprefix="ANIm_SGE_JG",
 
     # Send jobs to scheduler
     logger.info("Running jobs with scheduler...")
-    logger.info("Jobs passed to scheduler in order:")
-    for job in joblist:
-        logger.info("\t%s" % job.name)
+    if logger.isEnabledFor(logging.INFO):
+        logger.info("Jobs passed to scheduler in order:\n%s",
+                    "\n".join(["\t%s" % job.name for job in joblist]))
     build_and_submit_jobs(os.curdir, joblist, sgeargs)
     logger.info("Waiting for SGE-submitted jobs to finish (polling)")
     for job in joblist:
         job.wait()
 
 
-def populate_jobset(job, jobset, depth):
-    """ Creates a set of jobs, containing jobs at difference depths of the
-    dependency tree, retaining dependencies as strings, not Jobs.
-    """
-    jobset.add(job)
-    if len(job.dependencies) == 0:
-        return jobset
-    for j in job.dependencies:
-        jobset = populate_jobset(j, jobset, depth+1)
-    return jobset
-
-
 def build_directories(root_dir):
     """Constructs the subdirectories output, stderr, stdout, and jobs in the
     passed root directory. These subdirectories have the following roles:
@@ -135,47 +128,41 @@ def build_directories(root_dir):
 
     - root_dir   Path to the top-level directory for creation of subdirectories
     """
-    # If the root directory doesn't exist, create it
-    if not os.path.exists(root_dir):
-        os.mkdir(root_dir)
-
-    # Create subdirectories
-    directories = [os.path.join(root_dir, subdir) for subdir in
-                   ("output", "stderr", "stdout", "jobs")]
-    for dirname in directories:
-        os.makedirs(dirname, exist_ok=True)
+    # Create subdirectories; os.makedirs() also creates the root directory
+    # if it doesn't exist, so there is no need to check for it separately
+    for subdir in ("output", "stderr", "stdout", "jobs"):
+        os.makedirs(os.path.join(root_dir, subdir), exist_ok=True)
 
 
 def build_job_scripts(root_dir, jobs):
     """Constructs the script for each passed Job in the jobs iterable
 
     - root_dir      Path to output directory
-    """
-    # Loop over the job list, creating each job script in turn, and then adding
-    # scriptPath to the Job object
-    for job in jobs:
-        scriptpath = os.path.join(root_dir, "jobs", job.name)
-        with open(scriptpath, "w") as scriptfile:
-            scriptfile.write("#!/bin/sh\n#$ -S /bin/bash\n%s\n" % job.script)
-        job.scriptpath = scriptpath
 
-
-def extract_submittable_jobs(waiting):
-    """Obtain a list of jobs that are able to be submitted from the passed
-    list of pending jobs
-
-    - waiting           List of Job objects
+    Scripts are written concurrently, as on networked filesystems each
+    write/close is bound by latency rather than throughput.
+    """
+    jobdir = os.path.join(root_dir, "jobs")
+    jobs = list(jobs)
+    if not jobs:
+        return
+    workers = min(pyani_config.SGE_SUBMIT_WORKERS, len(jobs))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        # Consume the iterator, so that an exception raised in any
+        # worker thread is re-raised here
+        list(executor.map(lambda job: write_job_script(jobdir, job), jobs))
+
+
+def write_job_script(jobdir, job):
+    """Write the script for a single Job, and add scriptpath to the Job.
+
+    - jobdir        Path to directory for job scripts
+    - job           Job object
     """
-    submittable = set()            # Holds jobs that are able to be submitted
-    # Loop over each job, and check all the subjobs in that job's dependency
-    # list.  If there are any, and all of these have been submitted, then
-    # append the job to the list of submittable jobs.
-    for job in waiting:
-        unsatisfied = sum([(subjob.submitted is False) for subjob in
-                           job.dependencies])
-        if unsatisfied == 0:
-            submittable.add(job)
-    return list(submittable)
+    scriptpath = os.path.join(jobdir, job.name)
+    with open(scriptpath, "w") as scriptfile:
+        scriptfile.write("#!/bin/sh\n#$ -S /bin/bash\n%s\n" % job.script)
+    job.scriptpath = scriptpath
 
 
 def submit_safe_jobs(root_dir, jobs, sgeargs=None):
@@ -184,42 +171,64 @@ def submit_safe_jobs(root_dir, jobs, sgeargs=None):
 
     - root_dir      Path to output directory
     - jobs          Iterable of Job objects
+
+    None of the passed jobs may depend on another in the same iterable, so
+    qsub is called concurrently for all of them: each call is bound by the
+    round-trip to the SGE daemon, not by local CPU.
     """
-    # Loop over each job, constructing SGE command-line based on job settings
+    jobs = list(jobs)
+    if not jobs:
+        return
+    outdir = os.path.join(root_dir, "stdout")
+    errdir = os.path.join(root_dir, "stderr")
     for job in jobs:
-        job.out = os.path.join(root_dir, "stdout")
-        job.err = os.path.join(root_dir, "stderr")
-
-        # Add the job name, current working directory, and SGE stdout/stderr
-        # directories to the SGE command line
-        args = " -N %s " % (job.name)
-        args += " -cwd "
-        args += " -o %s -e %s " % (job.out, job.err)
-
-        # If a queue is specified, add this to the SGE command line
-        # LP: This has an undeclared variable, not sure why - delete?
-        #if job.queue is not None and job.queue in local_queues:
-        #    args += local_queues[job.queue]
-
-        # If the job is actually a JobGroup, add the task numbering argument
-        if isinstance(job, JobGroup):
-            args += "-t 1:%d " % (job.tasks)
-
-        # If there are dependencies for this job, hold the job until they are
-        # complete
-        if len(job.dependencies) > 0:
-            args += "-hold_jid "
-            for dep in job.dependencies:
-                args += dep.name + ","
-            args = args[:-1]
-
-        # Build the qsub SGE commandline (passing local environment)
-        qsubcmd = ("%s -V %s %s" %
-                   (pyani_config.QSUB_DEFAULT, args, job.scriptpath))
-        if sgeargs is not None:
-            qsubcmd = "%s %s" % (qsubcmd, sgeargs)
-        os.system(qsubcmd)               # Run the command
-        job.submitted = True             # Set the job's submitted flag to True
+        job.out, job.err = outdir, errdir
+
+    # The qsub arguments that are the same for every job are built once:
+    # current working directory, SGE stdout/stderr directories, passing
+    # local environment, and any additional arguments
+    qsubargs = [pyani_config.QSUB_DEFAULT, "-V", "-cwd",
+                "-o", outdir, "-e", errdir]
+    extraargs = [] if sgeargs is None else shlex.split(sgeargs)
+
+    workers = min(pyani_config.SGE_SUBMIT_WORKERS, len(jobs))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        list(executor.map(lambda job: submit_job(job, qsubargs, extraargs),
+                          jobs))
+
+
+def submit_job(job, qsubargs, extraargs):
+    """Submit a single Job or JobGroup to the Grid Engine server.
+
+    - job           Job object
+    - qsubargs      qsub command and arguments common to all jobs
+    - extraargs     Additional arguments to qsub, following the script
+
+    qsub is run directly, without a shell, and CalledProcessError is raised
+    if submission fails.
+    """
+    # Add the job name to the SGE command line
+    args = qsubargs + ["-N", job.name]
+
+    # If a queue is specified, add this to the SGE command line
+    # LP: This has an undeclared variable, not sure why - delete?
+    #if job.queue is not None and job.queue in local_queues:
+    #    args += local_queues[job.queue]
+
+    # If the job is actually a JobGroup, add the task numbering argument
+    if isinstance(job, JobGroup):
+        args += ["-t", "1:%d" % (job.tasks)]
+
+    # If there are dependencies for this job, hold the job until they are
+    # complete
+    if len(job.dependencies) > 0:
+        args += ["-hold_jid", ",".join(dep.name for dep in job.dependencies)]
+
+    # Build the qsub SGE commandline
+    args.append(job.scriptpath)
+    args += extraargs
+    subprocess.run(args, check=True)  # Run the command
+    job.submitted = True              # Set the job's submitted flag to True
 
 
 def submit_jobs(root_dir, jobs, sgeargs=None):
@@ -228,17 +237,43 @@ def submit_jobs(root_dir, jobs, sgeargs=None):
 
     - root_dir       Path to output directory
     - jobs           List of Job objects
+
+    Jobs are submitted in batches, in topological order (Kahn's algorithm).
+    Each job's count of unsubmitted dependencies, and the jobs waiting on
+    each dependency, are found in one pass. Submitting a batch decrements
+    the counts of its dependents, and those reaching zero form the next
+    batch, so every job and dependency is visited only once.
     """
-    waiting = list(jobs)                 # List of jobs still to be done
-    # Loop over the list of pending jobs, while there still are any
-    while len(waiting) > 0:
-        # extract submittable jobs
-        submittable = extract_submittable_jobs(waiting)
-        # run those jobs
+    jobs = list(jobs)
+    remaining = {}                       # Count of unsubmitted dependencies
+    dependents = defaultdict(list)       # Jobs waiting on each dependency
+    for job in jobs:
+        unsubmitted = [dep for dep in job.dependencies if dep.submitted is False]
+        remaining[job] = len(unsubmitted)
+        for dep in unsubmitted:
+            dependents[dep].append(job)
+
+    # Loop over batches of submittable jobs, while there still are any
+    waiting = set(jobs)                  # Set of jobs still to be done
+    submittable = [job for job in jobs if remaining[job] == 0]
+    while submittable:
+        # run those jobs, and remove them from the waiting set
         submit_safe_jobs(root_dir, submittable, sgeargs)
-        # remove those from the waiting list
+        waiting.difference_update(submittable)
+        # collect jobs whose dependencies have now all been submitted
+        released = []
         for job in submittable:
-            waiting.remove(job)
+            for dependent in dependents[job]:
+                remaining[dependent] -= 1
+                if remaining[dependent] == 0:
+                    released.append(dependent)
+        submittable = released
+
+    # Anything left over waits on a job that will never be submitted
+    if waiting:
+        raise ValueError("Jobs could not be submitted (dependency cycle, or "
+                         "dependency missing from job list): %s" %
+                         ", ".join(sorted(job.name for job in waiting)))
 
 
 def build_and_submit_jobs(root_dir, jobs, sgeargs=None):
@@ -145,6 +145,16 @@ class TestNUCmerCmdline(unittest.TestCase):
             assert_equal(job.dependencies[0].name,
                          "test_%06d-n" % idx)            # NUCmer job name
 
+    def test_nucmer_job_ordering(self):
+        """order NUCmer jobs by combined sequence length, largest first."""
+        orglengths = {'file1': 1, 'file2': 2, 'file3': 3, 'file4': 4}
+        joblist = anim.generate_nucmer_jobs(self.files, jobprefix="test",
+                                            org_lengths=orglengths)
+        assert_equal([job.dependencies[0].command for job in joblist],
+                     [self.ncmdlist[idx] for idx in (5, 4, 2, 3, 1, 0)])
+        for idx, job in enumerate(joblist):
+            assert_equal(job.name, "test_%06d-f" % idx)
+
 
 class TestDeltafileProcessing(unittest.TestCase):
 
@@ -170,6 +180,12 @@ class TestDeltafileProcessing(unittest.TestCase):
         result = anim.parse_delta(self.deltafile)
         assert_equal(result, (4073917, 2191))
 
+    def test_deltafiles_import(self):
+        """parses several NUCmer .filter files, as parse_delta() would."""
+        filterfiles = pyani_files.get_input_files(self.deltadir, '.filter')
+        assert_equal(pyani_files.map_files(anim.parse_delta, filterfiles),
+                     [anim.parse_delta(fname) for fname in filterfiles])
+
     def test_process_deltadir(self):
         """processes directory of .delta files into ANIResults."""
         seqfiles = pyani_files.get_fasta_files(self.seqdir)
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+
+"""Tests for pyani package input file handling
+
+These tests are intended to be run using the nose package
+(see https://nose.readthedocs.org/en/latest/).
+"""
+
+import json
+import os
+import shutil
+import tempfile
+import unittest
+
+from unittest import mock
+
+from nose.tools import (assert_equal, assert_raises)
+
+from pyani import pyani_files
+
+
+class TestInputFiles(unittest.TestCase):
+
+    """Class defining tests of input file identification."""
+
+    def setUp(self):
+        """Create an input directory with readable/unreadable subdirs."""
+        self.tmpdir = tempfile.mkdtemp()
+        for subdir in ('', 'sub', 'unreadable'):
+            os.makedirs(os.path.join(self.tmpdir, subdir), exist_ok=True)
+            with open(os.path.join(self.tmpdir, subdir, 'seq.fna'), 'w'):
+                pass
+        self.scandir = os.scandir
+
+    def tearDown(self):
+        """Remove temporary input."""
+        shutil.rmtree(self.tmpdir)
+
+    def scandir_denied(self, unreadable):
+        """Return an os.scandir() stand-in, refusing to list unreadable."""
+        def scandir(path):
+            if path == unreadable:
+                raise PermissionError(path)
+            return self.scandir(path)
+        return scandir
+
+    def test_skip_unreadable_subdir(self):
+        """skip subdirectories that cannot be listed, as os.walk() does."""
+        unreadable = os.path.join(self.tmpdir, 'unreadable')
+        with mock.patch.object(pyani_files.os, 'scandir',
+                               self.scandir_denied(unreadable)):
+            files = pyani_files.get_fasta_files(self.tmpdir, recurse=True)
+        assert_equal(sorted(files),
+                     [os.path.join(self.tmpdir, 'seq.fna'),
+                      os.path.join(self.tmpdir, 'sub', 'seq.fna')])
+
+    def test_unreadable_input_dir(self):
+        """raise an error if the input directory cannot be listed."""
+        with mock.patch.object(pyani_files.os, 'scandir',
+                               self.scandir_denied(self.tmpdir)):
+            assert_raises(PermissionError, pyani_files.get_fasta_files,
+                          self.tmpdir, recurse=True)
+
+
+class TestSequenceLengths(unittest.TestCase):
+
+    """Class defining tests of input sequence length calculation."""
+
+    def setUp(self):
+        """Set parameters for tests."""
+        self.seqdir = os.path.join('tests', 'test_input', 'sequences')
+        self.infiles = pyani_files.get_fasta_files(self.seqdir)
+        self.lengths = {'NC_002696': 4016947,
+                        'NC_010338': 5477872,
+                        'NC_011916': 4042929,
+                        'NC_014100': 4655622}
+        self.tmpdir = tempfile.mkdtemp()
+        self.cache = os.path.join(self.tmpdir, '.seqlen_cache')
+
+    def tearDown(self):
+        """Remove temporary output."""
+        shutil.rmtree(self.tmpdir)
+
+    def test_sequence_lengths(self):
+        """obtain total sequence lengths for input FASTA files."""
+        assert_equal(pyani_files.get_sequence_lengths(self.infiles),
+                     self.lengths)
+
+    def test_sequence_lengths_cached(self):
+        """obtain total sequence lengths, writing and reusing cache."""
+        assert_equal(pyani_files.get_sequence_lengths_cached(self.infiles,
+                                                             self.cache),
+                     self.lengths)
+        with open(self.cache, 'r') as ifh:
+            assert_equal(len(json.load(ifh)), len(self.infiles))
+        assert_equal(pyani_files.get_sequence_lengths_cached(self.infiles,
+                                                             self.cache),
+                     self.lengths)
+
+    def test_sequence_lengths_bad_cache(self):
+        """ignore a length cache that is valid JSON but malformed."""
+        for content in ([], {'x': 1}, {'x': [1, 2]}):
+            with open(self.cache, 'w') as ofh:
+                json.dump(content, ofh)
+            assert_equal(
+                pyani_files.get_sequence_lengths_cached(self.infiles,
+                                                        self.cache),
+                self.lengths)
+
+    def test_map_files(self):
+        """apply a function, with extra arguments, to each input file."""
+        target = [os.path.split(fname)[-1] for fname in self.infiles]
+        assert_equal(pyani_files.map_files(os.path.relpath, self.infiles,
+                                           self.seqdir), target)
+        assert_equal(pyani_files.map_files(os.path.relpath, self.infiles,
+                                           self.seqdir, workers=2), target)
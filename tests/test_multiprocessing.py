@@ -52,9 +52,11 @@ THE SOFTWARE.
 """
 
 import os
+import shutil
+import stat
 import unittest
 
-from nose.tools import assert_equal, nottest
+from nose.tools import assert_equal, assert_raises, nottest
 
 from pyani import run_multiprocessing, pyani_jobs, anib
 
@@ -93,6 +95,76 @@ class TestMultiprocessing(unittest.TestCase):
         target = [{cmd} for cmd in self.cmds]
         assert_equal(cmdsets, target)
 
+    def test_dependency_graph_order(self):
+        """module runs dependencies before the jobs that need them."""
+        fname = os.path.join(self.outdir, "dependency_done")
+        if os.path.exists(fname):
+            os.remove(fname)
+        dependency = pyani_jobs.Job("dummy_dependency", "touch %s" % fname)
+        jobgraph = []
+        for idx in range(4):
+            job = pyani_jobs.Job("dummy_with_dependency_%d" % idx,
+                                 "test -f %s" % fname)
+            job.add_dependency(dependency)
+            jobgraph.append(job)
+        result = run_multiprocessing.run_dependency_graph(jobgraph)
+        assert_equal(0, result)
+
+    def test_dependency_graph_cycle(self):
+        """module refuses to run a dependency graph with a cycle."""
+        fname = os.path.join(self.outdir, "cycle_ran")
+        if os.path.exists(fname):
+            os.remove(fname)
+        job1 = pyani_jobs.Job("dummy_cycle_1", "touch %s" % fname)
+        job2 = pyani_jobs.Job("dummy_cycle_2", "touch %s.2" % fname)
+        job1.add_dependency(job2)
+        job2.add_dependency(job1)
+        assert_raises(ValueError, run_multiprocessing.run_dependency_graph,
+                      [job1, job2])
+        assert_equal(os.path.exists(fname), False)
+
+    def test_dependency_graph_blastdb(self):
+        """module runs each BLAST job after the database it searches."""
+        stubdir = os.path.join(self.outdir, "stub_tools")
+        if os.path.exists(stubdir):
+            shutil.rmtree(stubdir)
+        os.makedirs(stubdir)
+        infiles = sorted(
+            os.path.join(self.seqdir, fname) for fname in os.listdir(self.seqdir)
+        )
+        # Stub makeblastdb "builds" its -out file, slowly for the last genome;
+        # stub blastn fails unless its -db file has been built
+        slowdb = os.path.split(infiles[-1])[-1]
+        stubs = {
+            "makeblastdb": 'case "$out" in *%s) sleep 2;; esac\n'
+            'touch "$out"\n' % slowdb,
+            "blastn": 'test -f "$db"\n',
+        }
+        for name, body in stubs.items():
+            stubpath = os.path.join(stubdir, name)
+            with open(stubpath, "w") as ofh:
+                ofh.write(
+                    "#!/bin/sh\n"
+                    "while [ $# -gt 0 ]; do\n"
+                    '  case "$1" in -out) out="$2";; -db) db="$2";; esac\n'
+                    "  shift\n"
+                    "done\n" + body
+                )
+            os.chmod(stubpath, os.stat(stubpath).st_mode | stat.S_IEXEC)
+        fragfiles = [
+            os.path.join(stubdir, os.path.split(fname)[-1].replace(".", "-fragments."))
+            for fname in infiles
+        ]
+        blastcmds = anib.make_blastcmd_builder(
+            "ANIb",
+            stubdir,
+            format_exe=os.path.join(stubdir, "makeblastdb"),
+            blast_exe=os.path.join(stubdir, "blastn"),
+        )
+        jobgraph = anib.make_job_graph(infiles, fragfiles, blastcmds)
+        result = run_multiprocessing.run_dependency_graph(jobgraph, workers=4)
+        assert_equal(0, result)
+
     def test_dependency_graph_run(self):
         """module runs dependency graph."""
         fragresult = anib.fragment_fasta_files(self.infiles, self.outdir, self.fraglen)
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+
+"""Tests for pyani package SGE job submission
+
+These tests are intended to be run using the nose package
+(see https://nose.readthedocs.org/en/latest/).
+
+qsub is never called: submit_safe_jobs() is replaced with a stub that
+records each batch of jobs passed to it.
+"""
+
+import unittest
+
+from unittest import mock
+
+from nose.tools import (assert_equal, assert_raises)
+
+from pyani import (pyani_jobs, run_sge)
+
+
+class TestSGESubmission(unittest.TestCase):
+
+    """Class defining tests of SGE job submission order."""
+
+    def setUp(self):
+        """Set up a small job dependency graph, and a record of batches."""
+        self.jobs = {name: pyani_jobs.Job(name, "echo %s" % name)
+                     for name in "abcde"}
+        self.jobs['c'].add_dependency(self.jobs['a'])
+        self.jobs['c'].add_dependency(self.jobs['b'])
+        self.jobs['d'].add_dependency(self.jobs['c'])
+        self.batches = []
+
+    def record_batch(self, root_dir, jobs, sgeargs=None):
+        """Stand in for submit_safe_jobs(), recording each batch."""
+        self.batches.append(sorted(job.name for job in jobs))
+        for job in jobs:
+            job.submitted = True
+
+    def test_submit_jobs_order(self):
+        """submit SGE jobs in batches, dependencies first."""
+        with mock.patch.object(run_sge, 'submit_safe_jobs',
+                               self.record_batch):
+            run_sge.submit_jobs('.', list(self.jobs.values()))
+        assert_equal(self.batches, [['a', 'b', 'e'], ['c'], ['d']])
+
+    def test_submit_jobs_cycle(self):
+        """refuse to submit SGE jobs with a dependency cycle."""
+        self.jobs['a'].add_dependency(self.jobs['d'])
+        with mock.patch.object(run_sge, 'submit_safe_jobs',
+                               self.record_batch):
+            assert_raises(ValueError, run_sge.submit_jobs, '.',
+                          list(self.jobs.values()))
+        assert_equal(self.batches, [['b', 'e']])